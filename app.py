@@ -8,10 +8,12 @@ from utils import (
     calculate_total_income,
     calculate_total_expense,
     calculate_profit_or_loss,
-    calculate_cost_of_cultivation_per_acre
+    calculate_cost_of_cultivation_per_acre,
+    calculate_expense_by_category
 )
 from chart_generator import generate_income_expense_chart
-from pdf_generator import generate_pdf_report
+from pdf_generator import generate_pdf_report, generate_portfolio_pdf_report
+from portfolio import PortfolioRollups
 
 app = Flask(__name__)
 
@@ -19,6 +21,10 @@ app = Flask(__name__)
 Path('static/charts').mkdir(parents=True, exist_ok=True)
 Path('reports').mkdir(parents=True, exist_ok=True)
 
+# Precomputed location / crop / season rollups, updated as reports are generated
+portfolio = PortfolioRollups(os.path.join('reports', 'portfolio.db'))
+portfolio.import_legacy_json(os.path.join('reports', 'portfolio_rollups.json'))
+
 
 @app.route('/', methods=['GET'])
 def index():
@@ -41,11 +47,17 @@ def generate():
         date_of_sowing = form_data.get('date_of_sowing', '')
         date_of_harvest = form_data.get('date_of_harvest', '')
         location = form_data.get('location', '').strip()
+        report_id = form_data.get('report_id', '').strip()
         
         # Validate required fields
         if not all([farmer_name, crop_name, season, total_acres > 0]):
             return render_template('form.html', error='Please fill in all required fields.'), 400
         
+        # A report ID is only sent to replace an earlier report; otherwise this is a new report
+        if report_id and not portfolio.has_report(report_id):
+            return render_template('form.html', error=f'Unknown report ID: {report_id}'), 400
+        report_id = report_id or portfolio.new_report_id()
+        
         # Parse expense data (support multiple entries)
         expenses = []
         expense_categories = form_data.getlist('expense_category')
@@ -140,7 +152,8 @@ def generate():
             'cost_per_acre': cost_per_acre,
             'chart_path': chart_path,
             'expenses': expenses,
-            'incomes': incomes
+            'incomes': incomes,
+            'report_id': report_id
         }
         
         # Generate PDF
@@ -157,14 +170,33 @@ def generate():
         except Exception as e:
             return render_template('form.html', error=f'PDF generation failed: {str(e)}'), 500
         
+        # Update portfolio rollups
+        try:
+            portfolio.record_report(
+                report_id,
+                location,
+                crop_name,
+                season,
+                total_acres,
+                total_income,
+                total_expense,
+                cost_per_acre,
+                calculate_expense_by_category(expenses)
+            )
+        except Exception as e:
+            # The farmer's report is ready; don't fail it over the rollup
+            print(f"Portfolio rollup update failed: {str(e)}")
+        
         # Return PDF as downloadable file
         try:
-            return send_file(
-                pdf_path,
+            response = send_file(
+                os.path.abspath(pdf_path),
                 as_attachment=True,
                 download_name=f"Farm_Finance_Report_{farmer_name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.pdf",
                 mimetype='application/pdf'
             )
+            response.headers['X-Report-Id'] = report_id
+            return response
         except Exception as e:
             return render_template('form.html', error=f'Error sending file: {str(e)}'), 500
     
@@ -175,6 +207,59 @@ def generate():
         return render_template('form.html', error=f'An unexpected error occurred: {str(e)}'), 500
 
 
+@app.route('/portfolio', methods=['GET'])
+def portfolio_report():
+    """Generate portfolio summary PDF from precomputed rollups."""
+    try:
+        location = request.args.get('location', '').strip()
+        crop_name = request.args.get('crop_name', '').strip()
+        season = request.args.get('season', '').strip()
+        
+        summary = portfolio.summarize(location, crop_name, season)
+        if summary is None:
+            return render_template('form.html', error='No generated reports match the selected portfolio filters.'), 404
+        
+        overall = summary['overall']
+        
+        # Generate chart
+        chart_filename = f"portfolio_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+        chart_path = os.path.join('static', 'charts', chart_filename)
+        
+        try:
+            generate_income_expense_chart(overall['total_income'], overall['total_expense'], chart_path)
+        except Exception as e:
+            # Continue without chart if generation fails
+            chart_path = None
+            print(f"Chart generation failed: {str(e)}")
+        
+        summary['chart_path'] = chart_path
+        
+        # Generate PDF
+        pdf_filename = f"portfolio_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        pdf_path = os.path.join('reports', pdf_filename)
+        
+        try:
+            logo_path = os.path.join('static', 'images', 'logo.png')
+            if not os.path.exists(logo_path):
+                logo_path = None
+            
+            generate_portfolio_pdf_report(summary, pdf_path, logo_path)
+        except Exception as e:
+            return render_template('form.html', error=f'PDF generation failed: {str(e)}'), 500
+        
+        return send_file(
+            os.path.abspath(pdf_path),
+            as_attachment=True,
+            download_name=f"Portfolio_Report_{datetime.now().strftime('%Y%m%d')}.pdf",
+            mimetype='application/pdf'
+        )
+    
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}")
+        print(traceback.format_exc())
+        return render_template('form.html', error=f'An unexpected error occurred: {str(e)}'), 500
+
+
 if __name__ == '__main__':
     app.run(debug=True)
 
@@ -181,7 +181,15 @@ class PDFGenerator:
         ]))
         
         self.story.append(summary_table)
-        self.story.append(Spacer(1, 0.6 * inch))
+        self.story.append(Spacer(1, 0.3 * inch))
+        
+        report_id = data.get('report_id')
+        if report_id:
+            self.story.append(Paragraph(
+                f"Report ID: {report_id} (enter it on the form to replace this report in portfolio totals)",
+                self.styles['Normal']
+            ))
+        self.story.append(Spacer(1, 0.3 * inch))
         
         # Embed chart
         chart_path = data.get('chart_path')
@@ -350,6 +358,150 @@ class PDFGenerator:
         self.story.append(ledger_table)
 
 
+class PortfolioPDFGenerator(PDFGenerator):
+    def generate_pdf(self, summary):
+        """
+        Generate the portfolio summary PDF from precomputed rollups.
+        
+        Args:
+            summary: Dictionary returned by PortfolioRollups.summarize()
+        """
+        filters = summary.get('filters', {})
+        scope = [value for value in (filters.get('location'), filters.get('crop_name'), filters.get('season')) if value]
+        
+        # Set dynamic title
+        self.report_title = f"Portfolio Summary _ {' _ '.join(scope) if scope else 'All Farms'}"
+        self.timestamp = f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        
+        # Create PDF document
+        doc = SimpleDocTemplate(
+            self.output_path,
+            pagesize=letter,
+            rightMargin=0.75*inch,
+            leftMargin=0.75*inch,
+            topMargin=1.5*inch,
+            bottomMargin=1*inch
+        )
+        
+        # Build content
+        self._add_portfolio_summary(summary)
+        self._add_cost_distribution(summary)
+        self._add_group_table("By Location", 'location', 'Location', summary.get('by_location', []))
+        self._add_group_table("By Crop", 'crop_name', 'Crop', summary.get('by_crop', []))
+        self._add_group_table("By Season", 'season', 'Season', summary.get('by_season', []))
+        
+        # Build PDF with header/footer
+        doc.build(self.story, onFirstPage=self._header_footer, onLaterPages=self._header_footer)
+    
+    def _table_style(self, header_color):
+        """Shared table style for portfolio tables."""
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(header_color)),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP')
+        ])
+    
+    def _add_portfolio_summary(self, summary):
+        """Add Section 1: Portfolio Summary."""
+        self.story.append(Paragraph("Portfolio Summary", self.styles['SectionHeading']))
+        self.story.append(Spacer(1, 0.6 * inch))
+        
+        overall = summary.get('overall', {})
+        
+        summary_data = [
+            ['Metric', 'Value'],
+            ['Reports', f"{overall.get('report_count', 0):,}"],
+            ['Total Acres', f"{overall.get('total_acres', 0):,.2f}"],
+            ['Total Income (₹)', f"{overall.get('total_income', 0):,.2f}"],
+            ['Total Expense (₹)', f"{overall.get('total_expense', 0):,.2f}"],
+            ['Profit/Loss (₹)', f"{overall.get('profit_or_loss', 0):,.2f}"],
+            ['Cost of Cultivation per Acre (₹)', f"{overall.get('cost_per_acre', 0):,.2f}"],
+            ['Average Report Cost per Acre (₹)', f"{overall.get('average_cost_per_acre', 0):,.2f}"],
+            ['Lowest Report Cost per Acre (₹)', f"{overall.get('cost_per_acre_min') or 0:,.2f}"],
+            ['Highest Report Cost per Acre (₹)', f"{overall.get('cost_per_acre_max') or 0:,.2f}"]
+        ]
+        
+        summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
+        summary_table.setStyle(self._table_style('#34495e'))
+        
+        self.story.append(summary_table)
+        self.story.append(Spacer(1, 0.6 * inch))
+        
+        # Embed chart
+        chart_path = summary.get('chart_path')
+        if chart_path and Path(chart_path).exists():
+            try:
+                chart_img = Image(chart_path, width=5*inch, height=3.75*inch)
+                self.story.append(chart_img)
+                self.story.append(Spacer(1, 0.3*inch))
+            except:
+                pass  # Skip chart if image can't be loaded
+        
+        self.story.append(PageBreak())
+    
+    def _add_cost_distribution(self, summary):
+        """Add Section 2: Cost per Acre Distribution and Top Expense Categories."""
+        self.story.append(Paragraph("Cost of Cultivation per Acre Distribution", self.styles['SectionHeading']))
+        self.story.append(Spacer(1, 0.3 * inch))
+        
+        distribution_data = [['Cost per Acre (₹)', 'Reports']]
+        for label, count in summary.get('cost_per_acre_distribution', []):
+            distribution_data.append([label, f'{count:,}'])
+        
+        distribution_table = Table(distribution_data, colWidths=[3*inch, 2*inch])
+        distribution_table.setStyle(self._table_style('#34495e'))
+        self.story.append(distribution_table)
+        self.story.append(Spacer(1, 0.6 * inch))
+        
+        self.story.append(Paragraph("Top Expense Categories", self.styles['SectionHeading']))
+        self.story.append(Spacer(1, 0.3 * inch))
+        
+        top_categories = summary.get('top_expense_categories', [])
+        if not top_categories:
+            self.story.append(Paragraph("No expense records found.", self.styles['Normal']))
+        else:
+            category_data = [['Category', 'Amount (₹)']]
+            for category, amount in top_categories:
+                category_data.append([category, f'{amount:,.2f}'])
+            
+            category_table = Table(category_data, colWidths=[3*inch, 2*inch])
+            category_table.setStyle(self._table_style('#e74c3c'))
+            self.story.append(category_table)
+        
+        self.story.append(PageBreak())
+    
+    def _add_group_table(self, heading, key, label, rollups):
+        """Add a table with one row per location, crop or season rollup."""
+        self.story.append(Paragraph(heading, self.styles['SectionHeading']))
+        self.story.append(Spacer(1, 0.3 * inch))
+        
+        group_data = [[label, 'Reports', 'Acres', 'Income (₹)', 'Expense (₹)', 'Cost/Acre (₹)']]
+        for rollup in rollups:
+            group_data.append([
+                rollup.get(key, '') or '-',
+                f"{rollup.get('report_count', 0):,}",
+                f"{rollup.get('total_acres', 0):,.2f}",
+                f"{rollup.get('total_income', 0):,.2f}",
+                f"{rollup.get('total_expense', 0):,.2f}",
+                f"{rollup.get('cost_per_acre', 0):,.2f}"
+            ])
+        
+        group_table = Table(group_data, colWidths=[1.6*inch, 0.7*inch, 0.8*inch, 1.1*inch, 1.1*inch, 1*inch])
+        group_table.setStyle(self._table_style('#2ecc71'))
+        
+        self.story.append(group_table)
+        self.story.append(Spacer(1, 0.6 * inch))
+
+
 def generate_pdf_report(data, output_path, logo_path=None):
     """
     Convenience function to generate PDF report.
@@ -364,4 +516,21 @@ def generate_pdf_report(data, output_path, logo_path=None):
     """
     generator = PDFGenerator(output_path, logo_path)
     generator.generate_pdf(data)
-    return output_path
\ No newline at end of file
+    return output_path
+
+
+def generate_portfolio_pdf_report(summary, output_path, logo_path=None):
+    """
+    Convenience function to generate the portfolio summary PDF.
+    
+    Args:
+        summary: Dictionary returned by PortfolioRollups.summarize()
+        output_path: Path where PDF will be saved
+        logo_path: Optional path to logo image
+        
+    Returns:
+        str: Path to generated PDF
+    """
+    generator = PortfolioPDFGenerator(output_path, logo_path)
+    generator.generate_pdf(summary)
+    return output_path
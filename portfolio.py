@@ -0,0 +1,558 @@
+import json
+import logging
+import os
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from utils import (
+    calculate_profit_or_loss,
+    calculate_cost_of_cultivation_per_acre
+)
+
+# Upper bounds (₹ per acre) of the cost of cultivation distribution buckets.
+# A final open-ended bucket collects everything above the last bound.
+COST_PER_ACRE_BUCKETS = [5000, 10000, 20000, 30000, 50000, 75000, 100000]
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_groups (
+    group_key TEXT PRIMARY KEY,
+    location TEXT NOT NULL,
+    crop_name TEXT NOT NULL,
+    season TEXT NOT NULL,
+    location_key TEXT NOT NULL,
+    crop_key TEXT NOT NULL,
+    season_key TEXT NOT NULL,
+    report_count INTEGER NOT NULL,
+    total_acres REAL NOT NULL,
+    total_income REAL NOT NULL,
+    total_expense REAL NOT NULL,
+    cost_per_acre_sum REAL NOT NULL,
+    cost_per_acre_min REAL,
+    cost_per_acre_max REAL,
+    cost_per_acre_buckets TEXT NOT NULL,
+    legacy_cost_per_acre_min REAL,
+    legacy_cost_per_acre_max REAL
+);
+CREATE TABLE IF NOT EXISTS group_categories (
+    group_key TEXT NOT NULL,
+    category_key TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL,
+    report_count INTEGER NOT NULL,
+    PRIMARY KEY (group_key, category_key)
+);
+CREATE TABLE IF NOT EXISTS reports (
+    report_id TEXT PRIMARY KEY,
+    group_key TEXT NOT NULL,
+    cost_per_acre REAL NOT NULL,
+    contribution TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_by_group ON reports (group_key, cost_per_acre);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_GROUP_FILTER = """
+    (:location = '' OR g.location_key = :location)
+    AND (:crop_name = '' OR g.crop_key = :crop_name)
+    AND (:season = '' OR g.season_key = :season)
+"""
+
+
+def _normalize(value):
+    """Key used for grouping and matching: ignores case and surrounding whitespace."""
+    return (value or '').strip().casefold()
+
+
+def _new_rollup(location='', crop_name='', season=''):
+    """Create an empty rollup for one location / crop / season group."""
+    return {
+        'location': location,
+        'crop_name': crop_name,
+        'season': season,
+        'report_count': 0,
+        'total_acres': 0.0,
+        'total_income': 0.0,
+        'total_expense': 0.0,
+        'cost_per_acre_sum': 0.0,
+        'cost_per_acre_min': None,
+        'cost_per_acre_max': None,
+        'cost_per_acre_buckets': [0] * (len(COST_PER_ACRE_BUCKETS) + 1),
+        'expense_by_category': {}
+    }
+
+
+def _bucket_index(cost_per_acre):
+    """Return the distribution bucket a cost per acre value falls into."""
+    for i, upper in enumerate(COST_PER_ACRE_BUCKETS):
+        if cost_per_acre <= upper:
+            return i
+    return len(COST_PER_ACRE_BUCKETS)
+
+
+def _contribution_rollup(contribution):
+    """Build a single-report rollup from a stored report contribution."""
+    cost_per_acre = contribution['cost_per_acre']
+
+    rollup = _new_rollup()
+    rollup['report_count'] = 1
+    rollup['total_acres'] = contribution['total_acres']
+    rollup['total_income'] = contribution['total_income']
+    rollup['total_expense'] = contribution['total_expense']
+    rollup['cost_per_acre_sum'] = cost_per_acre
+    rollup['cost_per_acre_min'] = cost_per_acre
+    rollup['cost_per_acre_max'] = cost_per_acre
+    rollup['cost_per_acre_buckets'][_bucket_index(cost_per_acre)] = 1
+
+    for category, amount in contribution['expense_by_category'].items():
+        key = _normalize(category)
+        if key not in rollup['expense_by_category']:
+            rollup['expense_by_category'][key] = {'category': category.strip(), 'amount': 0.0, 'report_count': 1}
+        rollup['expense_by_category'][key]['amount'] += amount
+
+    return rollup
+
+
+def _merge_rollup(target, source, sign=1):
+    """
+    Add (``sign=1``) or subtract (``sign=-1``) the aggregates of ``source`` into ``target`` in place.
+
+    Subtracting cannot restore min/max; callers that subtract must recompute them.
+    """
+    target['report_count'] += sign * source['report_count']
+    target['total_acres'] += sign * source['total_acres']
+    target['total_income'] += sign * source['total_income']
+    target['total_expense'] += sign * source['total_expense']
+    target['cost_per_acre_sum'] += sign * source['cost_per_acre_sum']
+
+    if sign > 0:
+        for key, pick in (('cost_per_acre_min', min), ('cost_per_acre_max', max)):
+            if source[key] is not None:
+                target[key] = source[key] if target[key] is None else pick(target[key], source[key])
+
+    for i, count in enumerate(source['cost_per_acre_buckets']):
+        target['cost_per_acre_buckets'][i] += sign * count
+
+    categories = target['expense_by_category']
+    for key, entry in source['expense_by_category'].items():
+        if key not in categories:
+            # Keep the first-seen spelling for display
+            categories[key] = {'category': entry['category'], 'amount': 0.0, 'report_count': 0}
+        categories[key]['amount'] += sign * entry['amount']
+        categories[key]['report_count'] += sign * entry['report_count']
+        if categories[key]['report_count'] <= 0:
+            del categories[key]
+
+
+def cost_per_acre_bucket_labels():
+    """
+    Labels for the cost of cultivation per acre distribution buckets.
+
+    Returns:
+        list: One label per bucket, in the same order as the bucket counts
+    """
+    labels = []
+    lower = 0
+    for upper in COST_PER_ACRE_BUCKETS:
+        labels.append(f'{lower:,} - {upper:,}')
+        lower = upper
+    labels.append(f'Above {lower:,}')
+    return labels
+
+
+
+
+class PortfolioRollups:
+    def __init__(self, store_path):
+        """
+        Initialize the rollup store.
+
+        Rollups live in a SQLite database with three tables: one row per
+        location / crop / season group (read by ``summarize``), the group's
+        expense categories, and one row per recorded report (used only to
+        replace or remove that report). SQLite's own locking makes the
+        store safe to share between worker processes.
+
+        Args:
+            store_path: Path of the SQLite database file
+        """
+        self.store_path = Path(store_path)
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._create_schema()
+        except sqlite3.DatabaseError as e:
+            self._move_aside(e)
+            self._create_schema()
+
+    def _connect(self):
+        """Open a connection; transactions are managed explicitly."""
+        return sqlite3.connect(self.store_path, timeout=30, isolation_level=None)
+
+    def _create_schema(self):
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _move_aside(self, error):
+        """Move an unreadable database out of the way instead of overwriting it."""
+        corrupt_path = self.store_path.with_name(
+            f"{self.store_path.name}.corrupt-{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        try:
+            os.replace(self.store_path, corrupt_path)
+        except FileNotFoundError:
+            return  # Another process already moved it aside
+        for suffix in ('-wal', '-shm', '-journal'):
+            Path(str(self.store_path) + suffix).unlink(missing_ok=True)
+        logger.error("Portfolio store %s is not a readable database (%s); moved to %s and started empty",
+                     self.store_path, error, corrupt_path)
+
+    @contextmanager
+    def _transaction(self, write):
+        """Run a transaction; write transactions take the database write lock up front."""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _group_key(location, crop_name, season):
+        """Build the grouping key, ignoring case and surrounding whitespace."""
+        return '|'.join(_normalize(part) for part in (location, crop_name, season))
+
+    @staticmethod
+    def new_report_id():
+        """
+        Create a report identifier.
+
+        Returns:
+            str: Identifier to pass to record_report() for a new report
+        """
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def _row_to_rollup(row):
+        """Convert a rollup_groups row into a rollup dictionary (without categories)."""
+        rollup = _new_rollup(row[1], row[2], row[3])
+        rollup.update({
+            'report_count': row[7],
+            'total_acres': row[8],
+            'total_income': row[9],
+            'total_expense': row[10],
+            'cost_per_acre_sum': row[11],
+            'cost_per_acre_min': row[12],
+            'cost_per_acre_max': row[13],
+            'cost_per_acre_buckets': json.loads(row[14]),
+            'legacy_cost_per_acre_min': row[15],
+            'legacy_cost_per_acre_max': row[16]
+        })
+        return rollup
+
+    def _load_group(self, conn, group_key):
+        """Load one group rollup with its categories, or None if it does not exist."""
+        row = conn.execute('SELECT * FROM rollup_groups WHERE group_key = ?', (group_key,)).fetchone()
+        if row is None:
+            return None
+        rollup = self._row_to_rollup(row)
+        for category_key, category, amount, report_count in conn.execute(
+                'SELECT category_key, category, amount, report_count FROM group_categories '
+                'WHERE group_key = ? ORDER BY rowid', (group_key,)):
+            rollup['expense_by_category'][category_key] = {
+                'category': category, 'amount': amount, 'report_count': report_count}
+        return rollup
+
+    def _save_group(self, conn, group_key, rollup):
+        """Write one group rollup and its categories, deleting the group once it is empty."""
+        conn.execute('DELETE FROM group_categories WHERE group_key = ?', (group_key,))
+        if rollup['report_count'] <= 0:
+            conn.execute('DELETE FROM rollup_groups WHERE group_key = ?', (group_key,))
+            return
+
+        conn.execute(
+            'INSERT OR REPLACE INTO rollup_groups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (group_key, rollup['location'], rollup['crop_name'], rollup['season'],
+             _normalize(rollup['location']), _normalize(rollup['crop_name']), _normalize(rollup['season']),
+             rollup['report_count'], rollup['total_acres'], rollup['total_income'], rollup['total_expense'],
+             rollup['cost_per_acre_sum'], rollup['cost_per_acre_min'], rollup['cost_per_acre_max'],
+             json.dumps(rollup['cost_per_acre_buckets']),
+             rollup.get('legacy_cost_per_acre_min'), rollup.get('legacy_cost_per_acre_max'))
+        )
+        conn.executemany(
+            'INSERT INTO group_categories VALUES (?, ?, ?, ?, ?)',
+            [(group_key, key, entry['category'], entry['amount'], entry['report_count'])
+             for key, entry in rollup['expense_by_category'].items()]
+        )
+
+    def _remove_contribution(self, conn, report_id):
+        """Subtract a stored report contribution from its group rollup."""
+        row = conn.execute(
+            'SELECT group_key, contribution FROM reports WHERE report_id = ?', (report_id,)).fetchone()
+        if row is None:
+            return
+        group_key, contribution = row[0], json.loads(row[1])
+        conn.execute('DELETE FROM reports WHERE report_id = ?', (report_id,))
+
+        rollup = self._load_group(conn, group_key)
+        _merge_rollup(rollup, _contribution_rollup(contribution), sign=-1)
+
+        # Min/max cannot be subtracted; when an extreme was removed, rescan this
+        # group's remaining reports through the (group_key, cost_per_acre) index
+        cost_per_acre = contribution['cost_per_acre']
+        if rollup['report_count'] > 0 and cost_per_acre in (rollup['cost_per_acre_min'], rollup['cost_per_acre_max']):
+            low, high = conn.execute(
+                'SELECT MIN(cost_per_acre), MAX(cost_per_acre) FROM reports WHERE group_key = ?',
+                (group_key,)).fetchone()
+            # Reports imported from the first JSON format have no rows; their extremes are kept separately
+            lows = [v for v in (low, rollup.get('legacy_cost_per_acre_min')) if v is not None]
+            highs = [v for v in (high, rollup.get('legacy_cost_per_acre_max')) if v is not None]
+            rollup['cost_per_acre_min'] = min(lows) if lows else None
+            rollup['cost_per_acre_max'] = max(highs) if highs else None
+
+        self._save_group(conn, group_key, rollup)
+
+    def has_report(self, report_id):
+        """
+        Check whether a report has been recorded.
+
+        Args:
+            report_id: Report identifier
+
+        Returns:
+            bool: True if the report is part of the rollups
+        """
+        with self._transaction(write=False) as conn:
+            return conn.execute(
+                'SELECT 1 FROM reports WHERE report_id = ?', (report_id,)).fetchone() is not None
+
+    def record_report(self, report_id, location, crop_name, season, total_acres,
+                      total_income, total_expense, cost_per_acre, expense_by_category):
+        """
+        Fold the metrics of one generated report into its group's rollup.
+
+        If ``report_id`` was recorded before, its earlier contribution is
+        replaced (even if location, crop or season changed); otherwise the
+        report is added.
+
+        Args:
+            report_id: Report identifier (see new_report_id())
+            location: Farm location
+            crop_name: Crop name
+            season: Season name
+            total_acres: Acres covered by the report
+            total_income: Total income of the report
+            total_expense: Total expense of the report
+            cost_per_acre: Cost of cultivation per acre of the report
+            expense_by_category: Mapping of expense category to amount
+        """
+        group_key = self._group_key(location, crop_name, season)
+        contribution = {
+            'total_acres': total_acres,
+            'total_income': total_income,
+            'total_expense': total_expense,
+            'cost_per_acre': cost_per_acre,
+            'expense_by_category': dict(expense_by_category)
+        }
+
+        with self._transaction(write=True) as conn:
+            self._remove_contribution(conn, report_id)
+
+            rollup = self._load_group(conn, group_key)
+            if rollup is None:
+                rollup = _new_rollup(location.strip(), crop_name.strip(), season.strip())
+
+            _merge_rollup(rollup, _contribution_rollup(contribution))
+            self._save_group(conn, group_key, rollup)
+            conn.execute(
+                'INSERT INTO reports VALUES (?, ?, ?, ?)',
+                (report_id, group_key, cost_per_acre, json.dumps(contribution, ensure_ascii=False))
+            )
+
+    def remove_report(self, report_id):
+        """
+        Remove a previously recorded report from the rollups.
+
+        Args:
+            report_id: Report identifier
+
+        Returns:
+            bool: True if the report was recorded and has been removed
+        """
+        with self._transaction(write=True) as conn:
+            if conn.execute('SELECT 1 FROM reports WHERE report_id = ?', (report_id,)).fetchone() is None:
+                return False
+            self._remove_contribution(conn, report_id)
+            return True
+
+    def import_legacy_json(self, json_path):
+        """
+        Import rollups saved by the earlier JSON store, once.
+
+        Both JSON layouts are understood: a plain mapping of groups, and
+        ``{'groups': ..., 'reports': ...}``. Imported reports keep their old
+        keys, which no form submission produces, so they are never replaced.
+        The JSON file is renamed to ``.imported`` afterwards.
+
+        Args:
+            json_path: Path of the legacy JSON file
+
+        Returns:
+            int: Number of groups imported
+        """
+        json_path = Path(json_path)
+        if not json_path.exists():
+            return 0
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Could not import legacy portfolio rollups from %s: %s", json_path, e)
+            return 0
+
+        imported = 0
+        with self._transaction(write=True) as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_json_imported'").fetchone():
+                return 0
+
+            if not isinstance(data, dict):
+                data = {}
+            groups = data.get('groups', data)
+            reports = data.get('reports', {}) if 'groups' in data else None
+
+            for group_key, legacy in groups.items():
+                legacy = dict(legacy)
+                categories = {}
+                for key, entry in legacy.get('expense_by_category', {}).items():
+                    if not isinstance(entry, dict):
+                        # First layout: {category name: amount}
+                        key, entry = _normalize(key), {'category': key.strip(), 'amount': entry,
+                                                       'report_count': legacy['report_count']}
+                    if key in categories:
+                        categories[key]['amount'] += entry['amount']
+                    else:
+                        categories[key] = dict(entry)
+                legacy['expense_by_category'] = categories
+
+                if reports is None:
+                    # First layout kept no per-report rows; remember its extremes for later rescans
+                    legacy['legacy_cost_per_acre_min'] = legacy['cost_per_acre_min']
+                    legacy['legacy_cost_per_acre_max'] = legacy['cost_per_acre_max']
+
+                rollup = self._load_group(conn, group_key)
+                if rollup is None:
+                    rollup = _new_rollup(legacy['location'], legacy['crop_name'], legacy['season'])
+                _merge_rollup(rollup, legacy)
+                for key in ('legacy_cost_per_acre_min', 'legacy_cost_per_acre_max'):
+                    if legacy.get(key) is not None:
+                        pick = min if key.endswith('min') else max
+                        rollup[key] = legacy[key] if rollup.get(key) is None else pick(rollup[key], legacy[key])
+                self._save_group(conn, group_key, rollup)
+                imported += 1
+
+            for report_key, report in (reports or {}).items():
+                conn.execute(
+                    'INSERT OR IGNORE INTO reports VALUES (?, ?, ?, ?)',
+                    ('legacy:' + report_key, report['group'], report['contribution']['cost_per_acre'],
+                     json.dumps(report['contribution'], ensure_ascii=False))
+                )
+
+            conn.execute("INSERT INTO meta VALUES ('legacy_json_imported', ?)", (str(json_path),))
+
+        os.replace(json_path, json_path.with_name(json_path.name + '.imported'))
+        logger.info("Imported %d portfolio groups from %s", imported, json_path)
+        return imported
+
+    def summarize(self, location='', crop_name='', season='', top_categories=5):
+        """
+        Combine the stored rollups into a portfolio summary.
+
+        Only the group and category tables are read, so the cost depends on
+        the number of location / crop / season groups, not on the number of
+        reports or entries behind them.
+
+        Args:
+            location: Optional location filter
+            crop_name: Optional crop filter
+            season: Optional season filter
+            top_categories: Number of expense categories to list
+
+        Returns:
+            dict: Summary data, or None if no reports match the filters
+        """
+        filters = {'location': _normalize(location), 'crop_name': _normalize(crop_name),
+                   'season': _normalize(season)}
+
+        with self._transaction(write=False) as conn:
+            groups = {}
+            for row in conn.execute(
+                    f'SELECT * FROM rollup_groups g WHERE {_GROUP_FILTER} ORDER BY g.rowid', filters):
+                groups[row[0]] = self._row_to_rollup(row)
+
+            for group_key, category_key, category, amount, report_count in conn.execute(
+                    'SELECT c.group_key, c.category_key, c.category, c.amount, c.report_count '
+                    'FROM group_categories c JOIN rollup_groups g ON g.group_key = c.group_key '
+                    f'WHERE {_GROUP_FILTER} ORDER BY g.rowid, c.rowid', filters):
+                groups[group_key]['expense_by_category'][category_key] = {
+                    'category': category, 'amount': amount, 'report_count': report_count}
+
+        if not groups:
+            return None
+
+        overall = _new_rollup()
+        by_dimension = {'location': {}, 'crop_name': {}, 'season': {}}
+        for rollup in groups.values():
+            _merge_rollup(overall, rollup)
+            for dimension, totals in by_dimension.items():
+                name = rollup[dimension]
+                key = _normalize(name)
+                if key not in totals:
+                    totals[key] = _new_rollup(**{dimension: name})
+                _merge_rollup(totals[key], rollup)
+
+        def describe(rollup):
+            rollup['profit_or_loss'] = calculate_profit_or_loss(
+                rollup['total_income'], rollup['total_expense'])
+            rollup['cost_per_acre'] = (
+                calculate_cost_of_cultivation_per_acre(rollup['total_expense'], rollup['total_acres'])
+                if rollup['total_acres'] > 0 else 0
+            )
+            return rollup
+
+        describe(overall)
+        overall['average_cost_per_acre'] = overall['cost_per_acre_sum'] / overall['report_count']
+
+        top = sorted(
+            ((entry['category'], entry['amount']) for entry in overall['expense_by_category'].values()),
+            key=lambda item: item[1],
+            reverse=True
+        )
+
+        return {
+            'filters': {'location': location, 'crop_name': crop_name, 'season': season},
+            'overall': overall,
+            'cost_per_acre_distribution': list(zip(
+                cost_per_acre_bucket_labels(), overall['cost_per_acre_buckets'])),
+            'top_expense_categories': top[:top_categories],
+            'by_location': sorted((describe(r) for r in by_dimension['location'].values()),
+                                  key=lambda r: _normalize(r['location'])),
+            'by_crop': sorted((describe(r) for r in by_dimension['crop_name'].values()),
+                              key=lambda r: _normalize(r['crop_name'])),
+            'by_season': sorted((describe(r) for r in by_dimension['season'].values()),
+                                key=lambda r: _normalize(r['season']))
+        }
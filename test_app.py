@@ -0,0 +1,84 @@
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('reportlab')
+pytest.importorskip('matplotlib')
+
+import app as farm_app
+from portfolio import PortfolioRollups
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The routes write charts and PDFs relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'static' / 'charts').mkdir(parents=True)
+    (tmp_path / 'reports').mkdir()
+    monkeypatch.setattr(farm_app, 'portfolio', PortfolioRollups(tmp_path / 'reports' / 'portfolio.db'))
+    return farm_app.app.test_client()
+
+
+def report_form(location='Nashik', report_id=''):
+    return {
+        'farmer_name': 'Ravi',
+        'location': location,
+        'crop_name': 'Onion',
+        'season': 'Rabi',
+        'total_acres': '2',
+        'date_of_sowing': '2025-11-01',
+        'date_of_harvest': '2026-03-01',
+        'report_id': report_id,
+        'expense_category': ['Seeds', 'seeds '],
+        'expense_amount': ['4000', '1000'],
+        'expense_date': ['2025-11-01', '2025-11-02'],
+        'expense_description': ['', ''],
+        'income_category': ['Crop Sale'],
+        'income_amount': ['50000'],
+        'income_date': ['2026-03-05'],
+        'income_description': ['']
+    }
+
+
+def test_portfolio_is_404_when_store_is_empty(client):
+    response = client.get('/portfolio')
+
+    assert response.status_code == 404
+    assert b'No generated reports match' in response.data
+
+
+def test_generate_then_portfolio_pdf(client):
+    response = client.post('/generate', data=report_form())
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
+    assert response.headers['X-Report-Id']
+
+    response = client.get('/portfolio?location=nashik&crop_name=ONION&season=rabi')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
+    assert response.data.startswith(b'%PDF')
+
+    assert client.get('/portfolio?location=Pune').status_code == 404
+
+
+def test_resubmission_replaces_only_with_report_id(client):
+    first = client.post('/generate', data=report_form())
+    client.post('/generate', data=report_form())
+    assert farm_app.portfolio.summarize()['overall']['report_count'] == 2
+
+    response = client.post('/generate', data=report_form(location='Pune',
+                                                        report_id=first.headers['X-Report-Id']))
+    assert response.status_code == 200
+    assert response.headers['X-Report-Id'] == first.headers['X-Report-Id']
+
+    summary = farm_app.portfolio.summarize()
+    assert summary['overall']['report_count'] == 2
+    assert [r['location'] for r in summary['by_location']] == ['Nashik', 'Pune']
+    assert summary['top_expense_categories'] == [('Seeds', 10000.0)]
+
+
+def test_generate_rejects_unknown_report_id(client):
+    response = client.post('/generate', data=report_form(report_id='does-not-exist'))
+
+    assert response.status_code == 400
+    assert b'Unknown report ID' in response.data
+    assert farm_app.portfolio.summarize() is None
@@ -0,0 +1,225 @@
+import json
+import sqlite3
+
+import pytest
+
+from portfolio import PortfolioRollups, _bucket_index, COST_PER_ACRE_BUCKETS
+from utils import calculate_expense_by_category
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PortfolioRollups(tmp_path / 'portfolio.db')
+
+
+def record(store, report_id=None, location='Nashik', crop='Onion', season='Rabi',
+           acres=2.0, income=50000.0, expenses=None):
+    """Record a report the same way the /generate route does; returns its report ID."""
+    report_id = report_id or store.new_report_id()
+    expenses = expenses if expenses is not None else [{'category': 'Seeds', 'amount': 10000.0}]
+    total_expense = sum(expense['amount'] for expense in expenses)
+    store.record_report(report_id, location, crop, season, acres, income, total_expense,
+                        total_expense / acres, calculate_expense_by_category(expenses))
+    return report_id
+
+
+def test_bucket_edges_are_inclusive_upper_bounds():
+    assert _bucket_index(0) == 0
+    assert _bucket_index(5000) == 0
+    assert _bucket_index(5000.01) == 1
+    assert _bucket_index(100000) == len(COST_PER_ACRE_BUCKETS) - 1
+    assert _bucket_index(100000.01) == len(COST_PER_ACRE_BUCKETS)
+
+
+def test_summarize_empty_store_returns_none(store):
+    assert store.summarize() is None
+
+
+def test_summarize_totals_and_min_max(store):
+    record(store, acres=2, expenses=[{'category': 'Seeds', 'amount': 4000}])
+    record(store, acres=1, expenses=[{'category': 'Labour', 'amount': 120000}])
+
+    overall = store.summarize()['overall']
+
+    assert overall['report_count'] == 2
+    assert overall['total_acres'] == 3
+    assert overall['total_income'] == 100000
+    assert overall['total_expense'] == 124000
+    assert overall['profit_or_loss'] == -24000
+    assert overall['cost_per_acre_min'] == 2000
+    assert overall['cost_per_acre_max'] == 120000
+    assert overall['average_cost_per_acre'] == 61000
+    assert overall['cost_per_acre_buckets'][0] == 1
+    assert overall['cost_per_acre_buckets'][-1] == 1
+
+
+def test_filters_ignore_case_and_whitespace(store):
+    record(store, location='Nashik', crop='Onion')
+    record(store, location=' nashik ', crop='ONION')
+    record(store, location='Pune', crop='Wheat')
+
+    summary = store.summarize(location='NASHIK')
+
+    assert summary['overall']['report_count'] == 2
+    assert [r['location'] for r in summary['by_location']] == ['Nashik']
+    assert [r['crop_name'] for r in summary['by_crop']] == ['Onion']
+    assert store.summarize(crop_name='rice') is None
+
+
+def test_same_details_without_report_id_are_added(store):
+    record(store)
+    record(store)
+
+    assert store.summarize()['overall']['report_count'] == 2
+
+
+def test_resubmission_with_report_id_replaces_earlier_report(store):
+    report_id = record(store, acres=2, expenses=[{'category': 'Seeds', 'amount': 1000}])
+    record(store, report_id, location='Pune', acres=4, expenses=[{'category': 'Labour', 'amount': 40000}])
+
+    summary = store.summarize()
+    overall = summary['overall']
+
+    assert overall['report_count'] == 1
+    assert overall['total_acres'] == 4
+    assert overall['total_expense'] == 40000
+    assert overall['cost_per_acre_min'] == overall['cost_per_acre_max'] == 10000
+    assert sum(overall['cost_per_acre_buckets']) == 1
+    assert summary['top_expense_categories'] == [('Labour', 40000)]
+    assert [r['location'] for r in summary['by_location']] == ['Pune']
+
+
+def test_resubmission_recomputes_min_max_from_remaining_reports(store):
+    record(store, acres=1, expenses=[{'category': 'Seeds', 'amount': 3000}])
+    report_id = record(store, acres=1, expenses=[{'category': 'Seeds', 'amount': 9000}])
+    record(store, location='Pune', acres=1, expenses=[{'category': 'Seeds', 'amount': 50000}])
+    record(store, report_id, acres=1, expenses=[{'category': 'Seeds', 'amount': 6000}])
+
+    nashik = store.summarize(location='Nashik')['overall']
+
+    assert nashik['cost_per_acre_min'] == 3000
+    assert nashik['cost_per_acre_max'] == 6000
+
+
+def test_remove_report(store):
+    report_id = record(store, location='Nashik')
+    record(store, location='Pune')
+
+    assert store.has_report(report_id)
+    assert store.remove_report(report_id) is True
+    assert store.remove_report(report_id) is False
+    assert not store.has_report(report_id)
+    assert store.summarize(location='Nashik') is None
+    assert store.summarize()['overall']['report_count'] == 1
+
+
+def test_expense_categories_ignore_case_and_keep_first_spelling(store):
+    record(store, expenses=[{'category': 'Seeds', 'amount': 1000}])
+    record(store, expenses=[{'category': 'seeds ', 'amount': 1000},
+                            {'category': 'SEEDS', 'amount': 500}])
+
+    assert store.summarize()['top_expense_categories'] == [('Seeds', 2500)]
+
+
+def test_other_instance_sees_updates(tmp_path):
+    path = tmp_path / 'portfolio.db'
+    first = PortfolioRollups(path)
+    second = PortfolioRollups(path)
+
+    record(first)
+    record(second)
+
+    assert first.summarize()['overall']['report_count'] == 2
+
+
+def test_summarize_does_not_read_reports(store, monkeypatch):
+    """Summary cost depends on groups, not on how many reports were recorded."""
+    record(store, location='Pune')
+
+    statements = []
+    connect = store._connect
+
+    def traced_connect():
+        conn = connect()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(store, '_connect', traced_connect)
+
+    store.summarize()
+    few_reports = list(statements)
+
+    for _ in range(200):
+        record(store, location='Pune')
+    statements.clear()
+    summary = store.summarize()
+
+    assert summary['overall']['report_count'] == 201
+    assert statements == few_reports
+    assert not any('FROM reports' in statement for statement in statements)
+
+
+def test_corrupt_database_is_moved_aside(tmp_path, caplog):
+    path = tmp_path / 'portfolio.db'
+    path.write_bytes(b'not a database' * 100)
+
+    store = PortfolioRollups(path)
+    record(store)
+
+    corrupt = list(tmp_path.glob('portfolio.db.corrupt-*'))
+    assert len(corrupt) == 1
+    assert corrupt[0].read_bytes() == b'not a database' * 100
+    assert 'moved to' in caplog.text
+    assert store.summarize()['overall']['report_count'] == 1
+
+
+def test_import_legacy_json_first_layout(store, tmp_path):
+    legacy_path = tmp_path / 'portfolio_rollups.json'
+    legacy_path.write_text(json.dumps({
+        'nashik|onion|rabi': {
+            'location': 'Nashik', 'crop_name': 'Onion', 'season': 'Rabi',
+            'report_count': 2, 'total_acres': 5.0, 'total_income': 100000.0, 'total_expense': 49000.0,
+            'cost_per_acre_sum': 18500.0, 'cost_per_acre_min': 6500, 'cost_per_acre_max': 12000,
+            'cost_per_acre_buckets': [0, 1, 1, 0, 0, 0, 0, 0],
+            'expense_by_category': {'Seeds': 10000, 'seeds': 1000, 'Labour': 38000}
+        }
+    }), encoding='utf-8')
+
+    assert store.import_legacy_json(legacy_path) == 1
+    assert store.import_legacy_json(legacy_path) == 0
+    assert (tmp_path / 'portfolio_rollups.json.imported').exists()
+
+    report_id = record(store, acres=1, expenses=[{'category': 'Seeds', 'amount': 20000}])
+    record(store, report_id, acres=1, expenses=[{'category': 'Seeds', 'amount': 8000}])
+
+    summary = store.summarize()
+    assert summary['overall']['report_count'] == 3
+    assert summary['overall']['cost_per_acre_min'] == 6500
+    assert summary['overall']['cost_per_acre_max'] == 12000
+    assert summary['top_expense_categories'][0] == ('Labour', 38000)
+    assert ('Seeds', 19000) in summary['top_expense_categories']
+
+
+def test_import_legacy_json_second_layout(store, tmp_path):
+    legacy_path = tmp_path / 'portfolio_rollups.json'
+    contribution = {'total_acres': 2.0, 'total_income': 50000.0, 'total_expense': 10000.0,
+                    'cost_per_acre': 5000.0, 'expense_by_category': {'Seeds': 10000.0}}
+    legacy_path.write_text(json.dumps({
+        'groups': {
+            'nashik|onion|rabi': {
+                'location': 'Nashik', 'crop_name': 'Onion', 'season': 'Rabi',
+                'report_count': 1, 'total_acres': 2.0, 'total_income': 50000.0, 'total_expense': 10000.0,
+                'cost_per_acre_sum': 5000.0, 'cost_per_acre_min': 5000.0, 'cost_per_acre_max': 5000.0,
+                'cost_per_acre_buckets': [1, 0, 0, 0, 0, 0, 0, 0],
+                'expense_by_category': {'seeds': {'category': 'Seeds', 'amount': 10000.0, 'report_count': 1}}
+            }
+        },
+        'reports': {'ravi|nashik|onion|rabi': {'group': 'nashik|onion|rabi', 'contribution': contribution}}
+    }), encoding='utf-8')
+
+    assert store.import_legacy_json(legacy_path) == 1
+    assert store.has_report('legacy:ravi|nashik|onion|rabi')
+
+    summary = store.summarize()
+    assert summary['overall']['report_count'] == 1
+    assert summary['top_expense_categories'] == [('Seeds', 10000.0)]
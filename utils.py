@@ -57,4 +57,26 @@ def calculate_cost_of_cultivation_per_acre(total_expense, total_acres):
     """
     if total_acres <= 0:
         raise ValueError("Total acres must be greater than zero")
-    return total_expense / total_acres
\ No newline at end of file
+    return total_expense / total_acres
+
+
+def calculate_expense_by_category(expenses):
+    """
+    Group expense amounts by their category.
+    
+    Categories are matched ignoring case and surrounding whitespace; the
+    first spelling seen is used as the category name.
+    
+    Args:
+        expenses: List of dictionaries, each containing "category" and "amount" keys
+        
+    Returns:
+        dict: Mapping of category name to total amount spent in that category
+    """
+    names = {}
+    totals = {}
+    for expense in expenses:
+        category = (expense.get("category", "") or "").strip() or "Uncategorised"
+        name = names.setdefault(category.casefold(), category)
+        totals[name] = totals.get(name, 0) + expense.get("amount", 0)
+    return totals